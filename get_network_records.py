@@ -13,6 +13,10 @@ Options:
 
     -n <filename>, --networks=<filename>
     CSV file with IP networks, format is: <network-name>,<IP network address>
+    The network address may be a CIDR (10.0.0.0/8), a range (10.0.0.1-10.0.0.9)
+    or a single address (10.0.0.1). The networks of each name are collapsed into
+    the smallest list of prefixes and prefixes shared between names are reported.
+    An IP address in a shared prefix is printed once for each name.
 
     -v, --verbose
     increase verbosity level
@@ -36,6 +40,69 @@ class Usage(Exception):
         self.msg = msg
 
 
+def parse_network(value):
+    """Return the (version, first, last) interval of a CIDR, a start-end range
+    or a single address, with the addresses as integers"""
+    if value is None:
+        raise ValueError("missing network")
+    value = value.strip()
+    if '-' in value:
+        start, end = value.split('-', 1)
+        start = ipaddr.IPAddress(start.strip())
+        end = ipaddr.IPAddress(end.strip())
+        if start.version != end.version or start > end:
+            raise ValueError("%s is not a valid range" % value)
+        return (start.version, int(start), int(end))
+    network = ipaddr.IPNetwork(value)
+    return (network.version, int(network.network), int(network.broadcast))
+
+
+def collapse_networks(intervals):
+    """Return the smallest sorted list of prefixes covering the intervals
+
+    Sorted intervals are merged with the next one when they overlap or are
+    adjacent, so collapsing takes O(n log n) whatever the input.
+    """
+    merged = []
+    for version, first, last in sorted(intervals):
+        if merged and merged[-1][0] == version and first <= merged[-1][2] + 1:
+            merged[-1][2] = max(merged[-1][2], last)
+        else:
+            merged.append([version, first, last])
+
+    collapsed = []
+    for version, first, last in merged:
+        collapsed.extend(ipaddr.summarize_address_range(
+            ipaddr.IPAddress(first, version), ipaddr.IPAddress(last, version)))
+    return collapsed
+
+
+def find_shared_networks(services):
+    """Return the (prefix, service, service) tuples of prefixes shared between services
+
+    The networks of each service must not overlap (see collapse_networks). As
+    prefixes are either nested or disjoint, sweeping them by start address finds
+    each shared prefix inside the larger prefixes still open at that address.
+    """
+    entries = []
+    for service, ip_networks in services.iteritems():
+        for network in ip_networks:
+            entries.append(((network.version, int(network.network),
+                network.prefixlen), network, service))
+    entries.sort()
+
+    shared = []
+    active = []
+    for key, network, service in entries:
+        active = [(version, last, other_service) for version, last, other_service
+            in active if version == key[0] and last >= key[1]]
+        for version, last, other_service in active:
+            if other_service != service:
+                shared.append((network, other_service, service))
+        active.append((key[0], int(network.broadcast), service))
+    return shared
+
+
 def get_records(sources_file, network_file, verbose):
     try:
         with open(sources_file) as csv_hdl:
@@ -46,12 +113,31 @@ def get_records(sources_file, network_file, verbose):
             reader = csv.DictReader(csv_hdl)
             for row in reader:
                 if row['name'] not in networks.keys():
-                    networks[row['name']] = set()
-                networks[row['name']].add(row['network'])
+                    networks[row['name']] = []
+                try:
+                    networks[row['name']].append(parse_network(row['network']))
+                except (ValueError, TypeError), e:
+                    print >>sys.stderr, "invalid network %s for %s: %s" % (
+                        row['network'], row['name'], e)
     except Exception, e:
         print "problem getting data"
         sys.exit(1)
 
+    raw_total = collapsed_total = 0
+    for service in sorted(networks):
+        raw_count = len(networks[service])
+        networks[service] = collapse_networks(networks[service])
+        raw_total += raw_count
+        collapsed_total += len(networks[service])
+        if verbose:
+            print >>sys.stderr, "NETWORKS: %s - %d collapsed to %d" % (service,
+                raw_count, len(networks[service]))
+    print >>sys.stderr, "NETWORKS: %d collapsed to %d" % (raw_total,
+        collapsed_total)
+    for network, service, other_service in find_shared_networks(networks):
+        print >>sys.stderr, "SHARED: %s - %s, %s" % (network, service,
+            other_service)
+
     for source, sfile in sources.iteritems():
         if verbose:
             print "SOURCE: %s - SOURCE FILE: %s" % (source, sfile)
@@ -62,9 +148,9 @@ def get_records(sources_file, network_file, verbose):
                 if not word_raw.startswith('#'):
                     try:
                         ip = ipaddr.IPAddress(word_raw)
-                        for service, ip_networks in networks.iteritems():
-                            for network in ip_networks:
-                                if ip in ipaddr.IPNetwork(network):
+                        for service in sorted(networks):
+                            for network in networks[service]:
+                                if ip in network:
                                     print ("%s %s") % (service, line)
                                     break
                     except:
@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure the crawler throughput against a local synthetic website.
+
+A local HTTP server generates a deterministic website: every page links to a fixed number of
+other pages chosen from a seeded random generator, so two runs with the same options crawl
+exactly the same graph. No network access is required.
+
+Usage: benchmark.py [-h] [-p <pages>] [-o <fan-out>] [-s <bytes>] [-l <milliseconds>] [-r <ratio>]
+                    [-n <pages>] [-t <seconds>] [-b <database>] [-x <pragma>] [-d <level>]
+
+Options:
+
+    -h, --help
+    Show this help message and exit
+
+    -p <pages>, --pages=<pages>
+    Number of pages of the synthetic website (Default is 1000)
+
+    -o <fan-out>, --fan-out=<fan-out>
+    Number of links in each page (Default is 10)
+
+    -s <bytes>, --page-size=<bytes>
+    Approximate size of each page (Default is 4096)
+
+    -l <milliseconds>, --latency=<milliseconds>
+    Delay of the server before answering each request (Default is 0)
+
+    -r <ratio>, --duplicate-ratio=<ratio>
+    Ratio of pages with the same content as another page, between 0 and 1 (Default is 0).
+    The original page of consecutive duplicates links to all of them, besides its fan-out
+
+    -n <pages>, --max-pages=<pages>
+    Stop after crawling this number of pages (Default is 500)
+
+    -t <seconds>, --max-seconds=<seconds>
+    Stop after crawling for this number of seconds (Default is no limit)
+
+    -b <database>, --database=<database>
+    The database file, removed before the benchmark starts (Default is benchmark.db)
+
+    -x <pragma>, --pragma=<pragma>
+    A SQLite pragma applied to the new database before its schema is created
+    (e.g. synchronous=OFF or page_size=16384), may be repeated
+
+    -d, --debug <level>
+    Filter out log messages with priority below level.
+    Level may be: DEBUG, INFO, WARNING, ERROR, CRITICAL
+"""
+
+__author__ = "Serrano M."
+__author_email__ = "serrano.miser[at]gmail.com"
+__license__ = "GPLv3"
+__version__ = "0.1"
+
+import os
+import sys
+import getopt
+import time
+import random
+import resource
+import multiprocessing
+import BaseHTTPServer
+import SocketServer
+from settings import *
+from yetanotherwebcrawler import YetAnotherWebCrawler, connect_to_database
+
+
+class Usage(Exception):
+    """The rules for the script inputs are not being respected."""
+    def __init__(self, msg):
+        self.msg = msg
+
+
+class SyntheticSite():
+    """
+    A deterministic website graph.
+
+    :param pages: The number of pages.
+    :type pages: :class:`int`
+
+    :param fan_out: The number of links in each page.
+    :type fan_out: :class:`int`
+
+    :param page_size: The approximate size of each page in bytes.
+    :type page_size: :class:`int`
+
+    :param duplicate_ratio: The ratio of pages with the same content as another page.
+    :type duplicate_ratio: :class:`float`
+
+    :param seed: The seed of the random generator (Default is 0).
+    :type seed: :class:`int`
+    """
+
+    def __init__(self, pages, fan_out, page_size, duplicate_ratio, seed=0):
+        self.pages = pages
+        self.fan_out = fan_out
+        self.page_size = page_size
+        self.duplicate_ratio = duplicate_ratio
+        self.seed = seed
+
+        # Each page is either original or a duplicate of the original page before it, so the
+        # pages form runs of an original page followed by its duplicates
+        self.sources = []
+        self.run_ends = dict()
+        for page in range(pages):
+            rand = random.Random('{}-duplicate-{}'.format(seed, page))
+            if page > 0 and rand.random() < duplicate_ratio:
+                self.sources.append(self.sources[-1])
+            else:
+                self.sources.append(page)
+            self.run_ends[self.sources[page]] = page
+
+    def get_page(self, page):
+        """
+        Generate the content of a page.
+
+        Duplicated pages have the same content as the original page of their run, links included.
+
+        :param page: The page index.
+        :type page: :class:`int`
+
+        :returns: :class:`str` -- The HTML content or None if the page does not exist.
+        """
+
+        if page < 0 or page >= self.pages:
+            return None
+        source = self.sources[page]
+        rand = random.Random('{}-{}'.format(self.seed, source))
+
+        # The pages of the run and the next page are always linked so that every page is reachable
+        # from the first one, while the duplicates keep the same content
+        links = [link % self.pages for link in range(source + 1, self.run_ends[source] + 2)]
+        links.extend(rand.randrange(self.pages) for _ in range(self.fan_out - 1))
+        content = ['<html><head><title>Page {}</title></head><body>'.format(source)]
+        content.extend('<a href="/page/{}">Page {}</a>'.format(link, link) for link in links)
+        size = sum(len(part) for part in content)
+        if size < self.page_size:
+            content.append('<p>{}</p>'.format('x' * (self.page_size - size)))
+        content.append('</body></html>')
+        return ''.join(content)
+
+
+class SyntheticSiteHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve the pages of the server synthetic website."""
+
+    def do_GET(self):
+        content = None
+        if self.path == '/':
+            content = self.server.site.get_page(0)
+        elif self.path.startswith('/page/'):
+            try:
+                content = self.server.site.get_page(int(self.path[len('/page/'):]))
+            except ValueError:
+                content = None
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if content is None:
+            self.send_error(404)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SyntheticSiteServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    A local HTTP server for a synthetic website.
+
+    :param site: The website to serve.
+    :type site: :class:`SyntheticSite`
+
+    :param latency: The delay before answering each request in seconds.
+    :type latency: :class:`float`
+    """
+
+    daemon_threads = True
+
+    def __init__(self, site, latency):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), SyntheticSiteHandler)
+        self.site = site
+        self.latency = latency
+
+
+class BenchmarkCrawler(YetAnotherWebCrawler):
+    """
+    A crawler that measures the time spent in each stage and requests a stop when there is nothing left to crawl.
+
+    Stages are: `fetch` (request and parsing of a webpage), `store` (database writes)
+    and `schedule` (choosing the next URL).
+    """
+
+    def __init__(self, db_hdl):
+        YetAnotherWebCrawler.__init__(self, db_hdl)
+        self.stages = dict()
+
+    def timed(self, stage, method, *args):
+        """
+        Call a method and add its duration to a stage.
+
+        :returns: The method result.
+        """
+
+        start = time.time()
+        try:
+            return method(*args)
+        finally:
+            calls, seconds = self.stages.get(stage, (0, 0.0))
+            self.stages[stage] = (calls + 1, seconds + time.time() - start)
+
+    def parse_content(self, url):
+        return self.timed('fetch', YetAnotherWebCrawler.parse_content, self, url)
+
+    def add_url_to_db(self, url, status=URL_STATUS_TODO):
+        return self.timed('store', YetAnotherWebCrawler.add_url_to_db, self, url, status)
+
+    def add_link_to_url(self, parent_url, link):
+        return self.timed('store', YetAnotherWebCrawler.add_link_to_url, self, parent_url, link)
+
+    def set_url_details_in_db(self, url, digest, status=URL_STATUS_DONE):
+        return self.timed('store', YetAnotherWebCrawler.set_url_details_in_db, self, url, digest, status)
+
+    def save_checkpoint(self, filter_hostname=None):
+        return self.timed('store', YetAnotherWebCrawler.save_checkpoint, self, filter_hostname)
+
+    def get_next_url_from_db(self, filter_hostname=None):
+        next_url = self.timed('schedule', YetAnotherWebCrawler.get_next_url_from_db, self, filter_hostname)
+        if next_url is None:
+            self.request_stop()
+        return next_url
+
+
+def serve(site, latency, address_queue):
+    """
+    Run a synthetic website server till the process is terminated.
+
+    :param address_queue: Queue where the server address is put once it is listening.
+    :type address_queue: :class:`multiprocessing.Queue`
+    """
+
+    server = SyntheticSiteServer(site, latency)
+    address_queue.put(server.server_address)
+    server.serve_forever()
+
+
+def run_benchmark(site, latency, db_location, max_pages=None, max_seconds=None, pragmas=()):
+    """
+    Crawl a synthetic website and measure the crawler performance.
+
+    The server runs in a separate process so its memory is not accounted in the crawler peak RSS.
+
+    :param site: The website to crawl.
+    :type site: :class:`SyntheticSite`
+
+    :param latency: The server delay before answering each request in seconds.
+    :type latency: :class:`float`
+
+    :param db_location: The database file, removed before crawling.
+    :type db_location: :class:`str`
+
+    :param pragmas: SQLite pragmas (e.g. synchronous=OFF) applied before the schema is created.
+    :type pragmas: :class:`list`
+
+    :returns: :class:`dict` -- The benchmark results.
+    """
+
+    address_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(site, latency, address_queue))
+    server.daemon = True
+    server.start()
+    db_hdl = None
+    try:
+        address = address_queue.get(timeout=10)
+        if os.path.isfile(db_location):
+            os.remove(db_location)
+        db_hdl = connect_to_database(db_location, pragmas)
+        crawl = BenchmarkCrawler(db_hdl)
+        started = time.time()
+        crawl.start_crawling('http://{}:{}/'.format(*address), None, max_pages, max_seconds)
+        elapsed = time.time() - started
+    finally:
+        if db_hdl:
+            db_hdl.close()
+        server.terminate()
+        server.join()
+
+    return {
+        'pages': crawl.pages_crawled,
+        'seconds': elapsed,
+        'pages_per_second': crawl.pages_crawled / elapsed if elapsed else 0.0,
+        'db_size': os.path.getsize(db_location),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'stages': crawl.stages,
+    }
+
+
+def print_results(results):
+    """
+    Print the benchmark results.
+
+    :param results: The results of :func:`run_benchmark`.
+    :type results: :class:`dict`
+    """
+
+    print('Pages crawled: {}'.format(results['pages']))
+    print('Elapsed time: {:.3f} s'.format(results['seconds']))
+    print('Throughput: {:.2f} pages/s'.format(results['pages_per_second']))
+    print('Database size: {} bytes'.format(results['db_size']))
+    print('Peak RSS: {} bytes'.format(results['peak_rss']))
+    print('<STAGE> <CALLS> <TOTAL SECONDS> <MEAN MILLISECONDS>')
+    for stage, (calls, seconds) in sorted(results['stages'].iteritems()):
+        print('{} {} {:.3f} {:.3f}'.format(stage, calls, seconds, 1000.0 * seconds / calls))
+
+
+def main(argv=None):
+
+    pages = 1000
+    fan_out = 10
+    page_size = 4096
+    latency = 0.0
+    duplicate_ratio = 0.0
+    max_pages = 500
+    max_seconds = None
+    db_location = 'benchmark.db'
+    pragmas = []
+
+    if argv is None:
+        argv = sys.argv
+    try:
+        try:
+            options, args = getopt.getopt(argv[1:], "hp:o:s:l:r:n:t:b:x:d:", ["help",
+                "pages=", "fan-out=", "page-size=", "latency=", "duplicate-ratio=", "max-pages=",
+                "max-seconds=", "database=", "pragma=", "debug="])
+            for opt, arg in options:
+                if opt in ('-h', '--help'):
+                    raise Usage(__doc__)
+                elif opt in ('-d', '--debug') and arg in LOGGING_LEVEL:
+                    # Logger configuration
+                    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=arg)
+                elif opt in ('-p', '--pages'):
+                    pages = int(arg)
+                elif opt in ('-o', '--fan-out'):
+                    fan_out = int(arg)
+                elif opt in ('-s', '--page-size'):
+                    page_size = int(arg)
+                elif opt in ('-l', '--latency'):
+                    latency = float(arg) / 1000
+                elif opt in ('-r', '--duplicate-ratio'):
+                    duplicate_ratio = float(arg)
+                elif opt in ('-n', '--max-pages'):
+                    max_pages = int(arg)
+                elif opt in ('-t', '--max-seconds'):
+                    max_seconds = float(arg)
+                elif opt in ('-b', '--database'):
+                    db_location = arg
+                elif opt in ('-x', '--pragma'):
+                    pragmas.append(arg)
+        except getopt.error, err:
+            raise Usage(err)
+        except ValueError, err:
+            raise Usage(err)
+
+        if pages < 1 or fan_out < 1 or not 0 <= duplicate_ratio <= 1:
+            raise Usage(__doc__)
+
+        site = SyntheticSite(pages, fan_out, page_size, duplicate_ratio)
+        print_results(run_benchmark(site, latency, db_location, max_pages, max_seconds, pragmas))
+
+    except Usage, err:
+        print >>sys.stderr, err.msg
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Check the host cache against local HTTP servers, without network access.
+
+A stub resolver points the `site.test` hostname to local HTTP servers serving different
+robots.txt files, and the checks below exercise the resolution, robots.txt rules, crawl delay
+and negative time to live of the host cache. The exit status is the number of failed checks.
+
+Usage: check_hostcache.py [-h] [-d <level>]
+
+Options:
+
+    -h, --help
+    Show this help message and exit
+
+    -d, --debug <level>
+    Filter out log messages with priority below level.
+    Level may be: DEBUG, INFO, WARNING, ERROR, CRITICAL
+"""
+
+__author__ = "Serrano M."
+__author_email__ = "serrano.miser[at]gmail.com"
+__license__ = "GPLv3"
+__version__ = "0.1"
+
+import sys
+import getopt
+import time
+import sqlite3
+import threading
+import BaseHTTPServer
+import SocketServer
+from settings import *
+from hostcache import HostCache
+
+
+class Usage(Exception):
+    """The rules for the script inputs are not being respected."""
+    def __init__(self, msg):
+        self.msg = msg
+
+
+class RobotsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve the server robots.txt and an empty webpage for any other path."""
+
+    def do_GET(self):
+        content = self.server.robots if self.path == '/robots.txt' else '<html></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RobotsServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    A local HTTP server with a given robots.txt, running in a thread of its own.
+
+    :param robots: The robots.txt content.
+    :type robots: :class:`str`
+    """
+
+    daemon_threads = True
+
+    def __init__(self, robots):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), RobotsHandler)
+        self.robots = robots
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def url(self, path):
+        """
+        Get the URL of a path of the server, using the `site.test` hostname.
+
+        :returns: :class:`str` -- The URL.
+        """
+
+        return 'http://site.test:{}{}'.format(self.server_address[1], path)
+
+
+def stub_resolver(hostname):
+    """
+    Resolve `site.test` to the local host, every other hostname fails.
+
+    :returns: :class:`list` -- The addresses of the hostname.
+    """
+
+    return ['127.0.0.1'] if hostname == 'site.test' else []
+
+
+def check(name, result):
+    """
+    Print the result of a check.
+
+    :returns: :class:`bool` -- The result.
+    """
+
+    print('{} {}'.format('OK  ' if result else 'FAIL', name))
+    return result
+
+
+def run_checks():
+    """
+    Run every check.
+
+    :returns: :class:`int` -- The number of failed checks.
+    """
+
+    disallow = RobotsServer('User-agent: *\nDisallow: /private\n')
+    delay = RobotsServer('User-agent: YetAnotherWebCrawler\nCrawl-delay: 0.5\n')
+    host_cache = HostCache(sqlite3.connect(':memory:'), resolver=stub_resolver, negative_ttl=1)
+    host_cache.install()
+    results = []
+    try:
+        # The robots.txt request only succeeds if site.test is resolved through the stub
+        results.append(check('resolution through the stub resolver',
+                host_cache.can_fetch(disallow.url('/')) and host_cache.robots.values()[-1].robots_status == 200))
+        results.append(check('robots.txt Disallow', not host_cache.can_fetch(disallow.url('/private/page'))))
+        results.append(check('robots.txt of another port is not shared', host_cache.can_fetch(delay.url('/private/page'))))
+
+        start = time.time()
+        host_cache.wait(delay.url('/a'))
+        host_cache.wait(delay.url('/b'))
+        results.append(check('Crawl-delay wait', time.time() - start >= 0.5))
+
+        results.append(check('unresolved host is not fetched', not host_cache.can_fetch('http://unknown.test/')))
+        host_cache.resolver = lambda hostname: ['127.0.0.1']
+        results.append(check('unresolved host is cached till the negative time to live',
+                not host_cache.can_fetch('http://unknown.test/')))
+        time.sleep(1)
+        results.append(check('unresolved host is resolved again after the negative time to live',
+                host_cache.get_addresses('unknown.test').addresses == ['127.0.0.1']))
+
+        host_cache.fetcher = lambda url: (503, None)
+        results.append(check('robots.txt server error disallows temporarily',
+                not host_cache.can_fetch('http://unknown.test/')
+                and host_cache.robots.values()[-1].expires - time.time() <= 1))
+    finally:
+        host_cache.uninstall()
+        disallow.shutdown()
+        delay.shutdown()
+
+    return results.count(False)
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv
+    try:
+        try:
+            options, args = getopt.getopt(argv[1:], "hd:", ["help", "debug="])
+            for opt, arg in options:
+                if opt in ('-h', '--help'):
+                    raise Usage(__doc__)
+                elif opt in ('-d', '--debug') and arg in LOGGING_LEVEL:
+                    # Logger configuration
+                    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=arg)
+        except getopt.error, err:
+            raise Usage(err)
+
+        return run_checks()
+
+    except Usage, err:
+        print >>sys.stderr, err.msg
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+
+"""A per-host cache of resolved addresses and robots.txt rules.
+
+Every hostname the crawler visits is resolved, and every origin (scheme, host and port) has its
+robots.txt fetched, only once per `HOST_CACHE_TTL` seconds. Failures are retried after
+`HOST_CACHE_NEGATIVE_TTL` seconds instead. The most recently used hosts and origins are kept in
+memory (up to `HOST_CACHE_SIZE` entries each) and all of them are persisted in the `hosts` and
+`robots` tables so a restarted crawler does not need to fetch everything again.
+
+Both the resolver and the robots.txt fetcher can be replaced, which allows the cache to be used
+offline with a stub resolver pointing to a local HTTP server.
+"""
+
+__author__ = "Serrano M."
+__author_email__ = "serrano.miser[at]gmail.com"
+__license__ = "GPLv3"
+__version__ = "0.1"
+
+import json
+import socket
+import sqlite3
+import time
+import robotparser
+from urlparse import urlparse
+from collections import OrderedDict
+import requests
+from settings import *
+
+
+# The system resolver, kept aside before the cache replaces it
+_system_getaddrinfo = socket.getaddrinfo
+
+
+class CacheEntry():
+    """
+    A cached value that must be refreshed after some time.
+
+    :param expires: Timestamp after which the entry must be refreshed.
+    :type expires: :class:`float`
+    """
+
+    def __init__(self, expires=0):
+        self.expires = expires
+
+    def expired(self, now=None):
+        """
+        Check if the entry must be refreshed.
+
+        :returns: :class:`bool` -- True if the entry time to live has passed.
+        """
+
+        return (now or time.time()) >= self.expires
+
+
+class AddressEntry(CacheEntry):
+    """
+    The resolved addresses of a host.
+
+    :param hostname: The host name.
+    :type hostname: :class:`str`
+
+    :param addresses: The resolved IP addresses of the host (empty if it could not be resolved).
+    :type addresses: :class:`list`
+    """
+
+    def __init__(self, hostname, addresses, expires=0):
+        CacheEntry.__init__(self, expires)
+        self.hostname = hostname
+        self.addresses = addresses
+
+
+class RobotsEntry(CacheEntry):
+    """
+    The robots.txt rules of an origin, i.e. a scheme, host and port.
+
+    :param origin: The origin (e.g. http://example.org:8080).
+    :type origin: :class:`str`
+
+    :param robots_status: The HTTP status code of the robots.txt request (None if the request failed).
+    :type robots_status: :class:`int`
+
+    :param robots: The robots.txt content.
+    :type robots: :class:`str`
+
+    :param last_request: Timestamp of the last request to the origin, used for its crawl delay (Default is None).
+    :type last_request: :class:`float`
+    """
+
+    def __init__(self, origin, robots_status=None, robots=None, expires=0, last_request=None):
+        CacheEntry.__init__(self, expires)
+        self.origin = origin
+        self.last_request = last_request
+        self.set_robots(robots_status, robots)
+
+    def set_robots(self, robots_status, robots):
+        """
+        Set the robots.txt rules of the origin.
+
+        Follows the usual conventions: access is denied on 401 and 403, and temporarily on
+        429 and server errors (see :meth:`temporary`). Any other error (or no robots.txt at all)
+        allows everything.
+
+        :param robots_status: The HTTP status code of the robots.txt request.
+        :type robots_status: :class:`int`
+
+        :param robots: The robots.txt content.
+        :type robots: :class:`str`
+        """
+
+        self.robots_status = robots_status
+        self.robots = robots
+        self.rules = robotparser.RobotFileParser()
+        self.rules.modified()
+        if robots_status in (401, 403) or (robots_status is not None and self.temporary()):
+            self.rules.disallow_all = True
+        elif robots_status != 200 or not robots:
+            self.rules.allow_all = True
+        else:
+            if isinstance(robots, unicode):
+                robots = robots.encode('utf8')
+            self.rules.parse(robots.splitlines())
+        self.crawl_delay = parse_crawl_delay(robots) if robots_status == 200 else 0
+
+    def temporary(self):
+        """
+        Check if the robots.txt request failed in a way that may be transient.
+
+        :returns: :class:`bool` -- True if the request failed, was rate limited (429) or got a server error.
+        """
+
+        return self.robots_status is None or self.robots_status == 429 or self.robots_status >= 500
+
+
+class HostCache():
+    """
+    The per-host cache of resolved addresses and robots.txt rules.
+
+    Addresses are cached by hostname and robots.txt rules by origin (scheme, host and port),
+    as robots.txt applies to a single origin.
+
+    :param db_hdl: The database handler.
+    :type db_hdl: class:`sqlite3.Connection`
+
+    :param resolver: Function returning a list of addresses for a hostname (Default is :func:`resolve_hostname`).
+    :type resolver: :class:`function`
+
+    :param fetcher: Function returning the status code and content of a robots.txt URL (Default is :func:`fetch_robots`).
+    :type fetcher: :class:`function`
+
+    :param ttl: The time to live of each entry in seconds (Default is HOST_CACHE_TTL).
+    :type ttl: :class:`int`
+
+    :param negative_ttl: The time to live of failed resolutions and robots.txt requests (Default is HOST_CACHE_NEGATIVE_TTL).
+    :type negative_ttl: :class:`int`
+
+    :param size: The maximum number of hosts and of origins kept in memory (Default is HOST_CACHE_SIZE).
+    :type size: :class:`int`
+    """
+
+    def __init__(self, db_hdl, resolver=None, fetcher=None, ttl=HOST_CACHE_TTL, negative_ttl=HOST_CACHE_NEGATIVE_TTL,
+            size=HOST_CACHE_SIZE):
+        self.db_hdl = db_hdl
+        self.resolver = resolver or resolve_hostname
+        self.fetcher = fetcher or fetch_robots
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.size = size
+        self.addresses = OrderedDict()
+        self.robots = OrderedDict()
+        with db_hdl:
+            self.db_cur = db_hdl.cursor()
+            create_schema(db_hdl)
+
+    def install(self):
+        """
+        Make the cached addresses available to every socket connection (e.g. the ones made by `requests`).
+
+        Hostnames not present in the cache are resolved by the system resolver as usual.
+        """
+
+        socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        """Restore the system resolver."""
+
+        socket.getaddrinfo = _system_getaddrinfo
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        """
+        Drop-in replacement of :func:`socket.getaddrinfo` that uses the cached addresses.
+
+        :returns: :class:`list` -- The same as :func:`socket.getaddrinfo`.
+        """
+
+        entry = self.addresses.get(host.lower()) if host else None
+        if entry is None or not entry.addresses:
+            return _system_getaddrinfo(host, port, *args, **kwargs)
+        addrinfo = []
+        for address in entry.addresses:
+            addrinfo.extend(_system_getaddrinfo(address, port, *args, **kwargs))
+        return addrinfo
+
+    def set_entry(self, entries, key, entry):
+        """
+        Keep an entry in memory as the most recently used one, evicting the least recently used if full.
+
+        :param entries: The in-memory cache.
+        :type entries: :class:`collections.OrderedDict`
+
+        :param key: The entry key.
+        :type key: :class:`str`
+
+        :param entry: The entry.
+        :type entry: :class:`CacheEntry`
+        """
+
+        entries.pop(key, None)
+        entries[key] = entry
+        while len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def get_addresses(self, hostname):
+        """
+        Get the addresses of a host, resolving it if needed.
+
+        The lookup order is: memory, database and finally the resolver.
+
+        :param hostname: The host name.
+        :type hostname: :class:`str`
+
+        :returns: :class:`AddressEntry` -- The host addresses.
+        """
+
+        logger = logging.getLogger('get_addresses')
+        now = time.time()
+        entry = self.addresses.pop(hostname, None)
+        if entry is None or entry.expired(now):
+            entry = self.get_addresses_from_db(hostname)
+            if entry is None or entry.expired(now):
+                addresses = self.resolver(hostname)
+                # A failed resolution may be transient, so it is retried sooner
+                entry = AddressEntry(hostname, addresses, now + (self.ttl if addresses else self.negative_ttl))
+                logger.debug('Host {} - resolved to {}.'.format(hostname, addresses))
+                self.add_addresses_to_db(entry)
+            else:
+                logger.debug('Host {} - loaded from the database.'.format(hostname))
+        self.set_entry(self.addresses, hostname, entry)
+        return entry
+
+    def get_robots(self, url_struct):
+        """
+        Get the robots.txt rules of the origin of a URL, fetching them if needed.
+
+        The lookup order is: memory, database and finally the network.
+
+        :param url_struct: The parsed URL.
+        :type url_struct: :class:`urlparse.ParseResult`
+
+        :returns: :class:`RobotsEntry` -- The robots.txt rules.
+        """
+
+        logger = logging.getLogger('get_robots')
+        origin = get_origin(url_struct)
+        now = time.time()
+        cached = self.robots.pop(origin, None)
+        entry = cached
+        if entry is None or entry.expired(now):
+            entry = self.get_robots_from_db(origin)
+            if entry is None or entry.expired(now):
+                robots_status, robots = self.fetcher('{}/robots.txt'.format(origin))
+                entry = RobotsEntry(origin, robots_status, robots)
+                # A failed request may be transient, so it is retried sooner
+                entry.expires = now + (self.negative_ttl if entry.temporary() else self.ttl)
+                logger.debug('Origin {} - robots.txt status {}.'.format(origin, robots_status))
+                self.add_robots_to_db(entry)
+            else:
+                logger.debug('Origin {} - loaded from the database.'.format(origin))
+            # The crawl delay still applies to the requests made before the refresh
+            if cached is not None:
+                entry.last_request = cached.last_request
+        self.set_entry(self.robots, origin, entry)
+        return entry
+
+    def add_addresses_to_db(self, entry):
+        """
+        Add or replace a host record in the database.
+
+        :param entry: The host addresses.
+        :type entry: :class:`AddressEntry`
+        """
+
+        logger = logging.getLogger('add_addresses_to_db')
+        try:
+            # Prepared statements are used to avoid SQL injection vulnerabilities
+            with self.db_hdl:
+                self.db_cur.execute('INSERT OR REPLACE INTO hosts(hostname, addresses, expires) VALUES (?, ?, ?)',
+                        (entry.hostname, json.dumps(entry.addresses), entry.expires))
+        except sqlite3.IntegrityError, err:
+            logger.debug('Host {} - could not be saved! {}'.format(entry.hostname, err))
+
+    def get_addresses_from_db(self, hostname):
+        """
+        Get a host record from the database.
+
+        :param hostname: The host name.
+        :type hostname: :class:`str`
+
+        :returns: :class:`AddressEntry` -- The host addresses or None if not found.
+        """
+
+        # Prepared statements are used to avoid SQL injection vulnerabilities
+        self.db_cur.execute('SELECT addresses, expires FROM hosts WHERE hostname=?', (hostname,))
+        record = self.db_cur.fetchone()
+        if record is None:
+            return None
+        return AddressEntry(hostname, json.loads(record[0]), record[1])
+
+    def add_robots_to_db(self, entry):
+        """
+        Add or replace a robots.txt record in the database.
+
+        :param entry: The robots.txt rules.
+        :type entry: :class:`RobotsEntry`
+        """
+
+        logger = logging.getLogger('add_robots_to_db')
+        try:
+            # Prepared statements are used to avoid SQL injection vulnerabilities
+            with self.db_hdl:
+                self.db_cur.execute('INSERT OR REPLACE INTO robots(origin, robots_status, robots, crawl_delay, expires) VALUES (?, ?, ?, ?, ?)',
+                        (entry.origin, entry.robots_status, entry.robots, entry.crawl_delay, entry.expires))
+        except sqlite3.IntegrityError, err:
+            logger.debug('Origin {} - could not be saved! {}'.format(entry.origin, err))
+
+    def get_robots_from_db(self, origin):
+        """
+        Get a robots.txt record from the database.
+
+        :param origin: The origin.
+        :type origin: :class:`str`
+
+        :returns: :class:`RobotsEntry` -- The robots.txt rules or None if not found.
+        """
+
+        # Prepared statements are used to avoid SQL injection vulnerabilities
+        self.db_cur.execute('SELECT robots_status, robots, expires FROM robots WHERE origin=?', (origin,))
+        record = self.db_cur.fetchone()
+        if record is None:
+            return None
+        return RobotsEntry(origin, record[0], record[1], record[2])
+
+    def can_fetch(self, url):
+        """
+        Check if a URL can be crawled, i.e. its host resolves and its robots.txt allows it.
+
+        :param url: The URL.
+        :type url: :class:`str`
+
+        :returns: :class:`bool` -- True if the URL can be crawled.
+        """
+
+        logger = logging.getLogger('can_fetch')
+        url_struct = urlparse(url)
+        if not url_struct.hostname or not self.get_addresses(url_struct.hostname).addresses:
+            logger.debug('URL {} - host could not be resolved.'.format(url))
+            return False
+        # The addresses are already cached, so the robots.txt request uses them
+        if not self.get_robots(url_struct).rules.can_fetch(ROBOTS_USER_AGENT, url):
+            logger.debug('URL {} - not allowed by robots.txt.'.format(url))
+            return False
+        return True
+
+    def wait(self, url):
+        """
+        Wait for the crawl delay of the URL origin (if any) since its last request.
+
+        :param url: The URL about to be requested.
+        :type url: :class:`str`
+        """
+
+        logger = logging.getLogger('wait')
+        url_struct = urlparse(url)
+        if not url_struct.hostname:
+            return
+        entry = self.get_robots(url_struct)
+        delay = min(entry.crawl_delay, ROBOTS_MAX_CRAWL_DELAY)
+        if delay and entry.last_request is not None:
+            remaining = entry.last_request + delay - time.time()
+            if remaining > 0:
+                logger.debug('Origin {} - waiting {} seconds (crawl delay).'.format(entry.origin, remaining))
+                time.sleep(remaining)
+        entry.last_request = time.time()
+
+
+def get_origin(url_struct):
+    """
+    Get the origin of a URL, i.e. its scheme, host and port.
+
+    :param url_struct: The parsed URL.
+    :type url_struct: :class:`urlparse.ParseResult`
+
+    :returns: :class:`str` -- The origin (e.g. http://example.org:8080).
+    """
+
+    netloc = url_struct.hostname
+    if url_struct.port:
+        netloc = '{}:{}'.format(netloc, url_struct.port)
+    return '{}://{}'.format(url_struct.scheme.lower(), netloc)
+
+
+def resolve_hostname(hostname):
+    """
+    Resolve a hostname with the system resolver.
+
+    :param hostname: The host name.
+    :type hostname: :class:`str`
+
+    :returns: :class:`list` -- The IP addresses of the host (empty if it could not be resolved).
+    """
+
+    try:
+        addrinfo = _system_getaddrinfo(hostname, None, 0, socket.SOCK_STREAM)
+    except socket.error:
+        return []
+    addresses = []
+    for info in addrinfo:
+        if info[4][0] not in addresses:
+            addresses.append(info[4][0])
+    return addresses
+
+
+def fetch_robots(url):
+    """
+    Fetch a robots.txt file.
+
+    :param url: The robots.txt URL.
+    :type url: :class:`str`
+
+    :returns: :class:`tuple` -- The HTTP status code (None if the request failed) and the content.
+    """
+
+    logger = logging.getLogger('fetch_robots')
+    try:
+        response = requests.get(url, headers=CRAWLER_USER_AGENT, timeout=ROBOTS_TIMEOUT)
+        return response.status_code, response.text
+    except requests.RequestException, err:
+        logger.debug('URL {} - robots.txt request error {}'.format(url, err))
+        return None, None
+
+
+def parse_crawl_delay(robots):
+    """
+    Get the Crawl-delay value of a robots.txt that applies to the crawler.
+
+    A group naming the crawler has precedence over the `*` group.
+
+    :param robots: The robots.txt content.
+    :type robots: :class:`str`
+
+    :returns: :class:`float` -- The crawl delay in seconds (0 if none applies).
+    """
+
+    delays = dict()
+    agents = []
+    in_rules = False
+    for line in (robots or '').splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = [part.strip() for part in line.split(':', 1)]
+        field = field.lower()
+        if field == 'user-agent':
+            # A User-agent line after rules starts a new group
+            if in_rules:
+                agents = []
+                in_rules = False
+            agents.append(value.lower())
+        else:
+            in_rules = True
+            if field == 'crawl-delay':
+                try:
+                    for agent in agents:
+                        delays.setdefault(agent, float(value))
+                except ValueError:
+                    continue
+
+    user_agent = ROBOTS_USER_AGENT.lower()
+    for agent, delay in delays.iteritems():
+        if agent != '*' and agent in user_agent:
+            return delay
+    return delays.get('*', 0)
+
+
+def create_schema(db_hdl):
+    """
+    Create the database schema of the host cache, if it does not exist yet.
+
+    :param db_hdl: The database handler.
+    :type db_hdl: class:`sqlite3.Connection`
+    """
+
+    db_hdl.execute('CREATE TABLE IF NOT EXISTS hosts (hostname varchar primary key, addresses varchar, expires long)')
+    db_hdl.execute('CREATE TABLE IF NOT EXISTS robots\
+ (origin varchar primary key, robots_status integer DEFAULT NULL, robots varchar DEFAULT NULL, crawl_delay real DEFAULT 0, expires long)')
@@ -16,12 +16,40 @@ CRAWLER_REFRESH_PERIOD = 300
 # The Crawler User-Agent
 CRAWLER_USER_AGENT = {'User-agent': 'Mozilla/5.0 YetAnotherWebCrawler 0.1'}
 
+# The Crawler product token, matched against the User-agent lines of robots.txt
+ROBOTS_USER_AGENT = 'YetAnotherWebCrawler'
+
+# The robots.txt request timeout in seconds
+ROBOTS_TIMEOUT = 10
+
+# The maximum Crawl-delay honoured, in seconds. Longer delays are capped.
+ROBOTS_MAX_CRAWL_DELAY = 60
+
+# The time to live of the resolved addresses and robots.txt rules of a host
+HOST_CACHE_TTL = 86400
+
+# The time to live of failed host resolutions and robots.txt requests (including 429 and server errors),
+# which may be transient
+HOST_CACHE_NEGATIVE_TTL = 300
+
+# The maximum number of hosts (and of robots.txt origins) kept in memory. Least recently used hosts are evicted first.
+HOST_CACHE_SIZE = 1000
+
 # Available Get operations to the user
 OPERATION_GET = 1
 OPERATION_ALL = 2
+OPERATION_EXPORT = 3
+OPERATION_SUMMARY = 4
+
+# Available export formats
+EXPORT_FORMATS = ['jsonl', 'csv']
+
+# Number of database rows read at a time when exporting
+EXPORT_BATCH_SIZE = 1000
 
 # Status of the URL
 URL_STATUS_PROCESSING = 0
 URL_STATUS_TODO = 1
 URL_STATUS_DONE = 2
+URL_STATUS_NAMES = {URL_STATUS_PROCESSING: 'PROCESSING', URL_STATUS_TODO: 'TODO', URL_STATUS_DONE: 'DONE'}
 ALLOWED_URL_SCHEMES = ['http', 'https']
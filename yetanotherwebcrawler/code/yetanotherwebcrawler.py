@@ -8,6 +8,11 @@ Simple `show` operations are also available, if more detailed access is required
 access the database directly.
 
 Usage: yetanotherwebcrawler.py [-h] [-u <URL> [-f <filter hostname>]] [-g <URL>] [-a] [-d <level>]
+                               [--max-pages=<pages>] [--max-seconds=<seconds>] [--max-bytes=<bytes>]
+       yetanotherwebcrawler.py -e <format> [-o <file>] [-f <filter hostname>] [--status=<status>]
+                               [--since=<time>] [--until=<time>] [--digest=<digest>]
+       yetanotherwebcrawler.py --summary [-f <filter hostname>] [--status=<status>]
+                               [--since=<time>] [--until=<time>] [--digest=<digest>]
 
 Options:
 
@@ -18,7 +23,13 @@ Options:
     First URL to begin the crawling operation
 
     -f <filter hostname>, --filter-hostname=<filter hostname>
-    Only crawl URLs from the hierarchy of a specific hostname
+    Only crawl URLs from the hierarchy of a specific hostname.
+    When resuming without it, the filter of the previous run is used; -f '' crawls without filter
+
+    --max-pages=<pages>, --max-seconds=<seconds>, --max-bytes=<bytes>
+    Stop crawling after a number of webpages, seconds or downloaded bytes,
+    or as soon as no URL is left to crawl if any of them is given.
+    The crawler also stops on SIGINT or SIGTERM, and the next run resumes where it stopped
 
     -g <URL>, --get-url=<URL>
     Get specific URL record from the database
@@ -26,6 +37,28 @@ Options:
     -a, --all
     Get all URLs records from the database
 
+    -e <format>, --export=<format>
+    Export the URL records from the database, one per line. Format may be: jsonl, csv
+    Records are not sorted: they follow the index used by the filters (e.g. by update time
+    for --status, --since and --until, by reversed hostname for -f) or the identifier order
+
+    -o <file>, --output=<file>
+    Write the exported URL records to a file instead of the standard output
+
+    --summary
+    Count the URL records from the database by status and by hostname
+
+    --status=<status>
+    Only export or count URL records with a status, or a comma separated list of them.
+    Status may be: PROCESSING, TODO, DONE
+
+    --since=<time>, --until=<time>
+    Only export or count URL records updated in a time range (`since` included, `until` excluded).
+    Time may be a timestamp, YYYY-MM-DD or YYYY-MM-DD HH:MM:SS
+
+    --digest=<digest>
+    Only export or count URL records with a webpage content digest
+
     -d, --debug <level>
     Filter out log messages with priority below level.
     Level may be: DEBUG, INFO, WARNING, ERROR, CRITICAL
@@ -40,13 +73,18 @@ import os
 import sys
 import getopt
 import sqlite3
+import json
+import csv
+from collections import OrderedDict
 import requests
 from urlparse import urlparse
 import datetime
 import time
+import signal
 from lxml import etree
 import hashlib
 from settings import *
+from hostcache import HostCache
 import pdb
 
 
@@ -73,14 +111,23 @@ class YetAnotherWebCrawler():
 
     :param url_digest: The URL webpage content digest.
     :type url_digest: class:`str`
+
+    :param url_size: The URL webpage content size in bytes.
+    :type url_size: class:`int`
+
+    :param host_cache: The resolved addresses and robots.txt rules of each host (Default is a new HostCache).
+    :type host_cache: class:`hostcache.HostCache`
     """
 
-    def __init__(self, db_hdl, url=None):
+    def __init__(self, db_hdl, url=None, host_cache=None):
         self.url = url
         self.db_hdl = db_hdl
         self.url_digest = None
+        self.url_size = 0
+        self.stop_requested = False
         with db_hdl:
             self.db_cur = db_hdl.cursor()
+        self.host_cache = host_cache or HostCache(db_hdl)
 
     def url_valid_by_sufix(self, url, filter_hostname):
         """
@@ -170,6 +217,8 @@ class YetAnotherWebCrawler():
         """
         Parse a webpage and create a list of URLs found in it.
 
+        The webpage is only requested if its host robots.txt allows it, and after the host crawl delay.
+
         :param url: The webpage URL.
         :type url: :class:`str`
 
@@ -180,8 +229,14 @@ class YetAnotherWebCrawler():
         try:
             url_list = []
             tree = None
+            self.url_digest = None
+            self.url_size = 0
+            if not self.host_cache.can_fetch(url):
+                return url_list
+            self.host_cache.wait(url)
             logger.debug("URL {} - requesting.".format(url))
             webpage = requests.get(url, headers=CRAWLER_USER_AGENT)
+            self.url_size = len(webpage.content)
             # Parse the webpage
             try:
                 tree = etree.HTML(webpage.text)
@@ -217,7 +272,8 @@ class YetAnotherWebCrawler():
             # Add the URL record to the database and rollback if an error occurs.
             # Prepared statements are used to avoid SQL injection vulnerabilities.
             with self.db_hdl:
-                self.db_cur.execute('INSERT INTO urls(url, status, created, updated) VALUES (?, ?, ?, ?)', (url.decode('utf8'), status, now, now))
+                self.db_cur.execute('INSERT INTO urls(url, reversed_netloc, status, created, updated) VALUES (?, ?, ?, ?, ?)',
+                        (url.decode('utf8'), reverse_netloc(url.decode('utf8')), status, now, now))
             logger.debug('URL {} added to the database.'.format(url))
         except sqlite3.IntegrityError, err:
             try:
@@ -333,6 +389,87 @@ class YetAnotherWebCrawler():
 
         return self.db_cur.execute('SELECT url FROM urls')
 
+    def get_urls_filter(self, statuses=None, filter_hostname=None, since=None, until=None, digest=None):
+        """
+        Build the SQL condition that selects URLs, every filter given must match.
+
+        The hostname suffix is matched as a range of the reversed network location,
+        so that every filter can be answered using an index.
+
+        :param statuses: The URL statuses (Default is None).
+        :type statuses: :class:`list`
+
+        :param filter_hostname: The suffix of the network location part of the URL (Default is None).
+        :type filter_hostname: :class:`str`
+
+        :param since: The minimum update timestamp, included (Default is None).
+        :type since: :class:`float`
+
+        :param until: The maximum update timestamp, excluded (Default is None).
+        :type until: :class:`float`
+
+        :param digest: The URL webpage content digest (Default is None).
+        :type digest: :class:`str`
+
+        :returns: :class:`tuple` -- The WHERE clause (empty if no filter is given) and its parameters.
+        """
+
+        conditions = []
+        params = []
+        if statuses:
+            conditions.append('status IN ({})'.format(', '.join('?' * len(statuses))))
+            params.extend(statuses)
+        if filter_hostname:
+            prefix = reverse_netloc(u'//{}'.format(filter_hostname.decode('utf8')))
+            conditions.append('reversed_netloc >= ? AND reversed_netloc < ?')
+            params.extend((prefix, prefix[:-1] + unichr(ord(prefix[-1]) + 1)))
+        if since is not None:
+            conditions.append('updated >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('updated < ?')
+            params.append(until)
+        if digest:
+            conditions.append('digest = ?')
+            params.append(digest)
+
+        if not conditions:
+            return '', params
+        return ' WHERE {}'.format(' AND '.join(conditions)), params
+
+    def query_urls_from_db(self, **filters):
+        """
+        Get the URL records from the database that match the filters of :meth:`get_urls_filter`.
+
+        A cursor of its own is used, so records can be read while the crawler uses the database.
+        Records are not sorted, so they are read in the order of the index used by the filters
+        and the first ones are available without reading all of them.
+
+        :returns: :class:`sqlite3.Cursor` -- The URL records, in no particular order.
+        """
+
+        where, params = self.get_urls_filter(**filters)
+        # Prepared statements are used to avoid SQL injection vulnerabilities
+        return self.db_hdl.cursor().execute('SELECT id, url, status, digest, created, updated FROM urls{}'.format(where), params)
+
+    def count_urls_from_db(self, group_by, **filters):
+        """
+        Count the URL records from the database that match the filters of :meth:`get_urls_filter`.
+
+        :param group_by: Count by `status` or by `host`.
+        :type group_by: :class:`str`
+
+        :returns: :class:`list` -- Pairs of status (or hostname) and count, the biggest counts first.
+        """
+
+        column = {'status': 'status', 'host': 'reversed_netloc'}[group_by]
+        where, params = self.get_urls_filter(**filters)
+        # Prepared statements are used to avoid SQL injection vulnerabilities
+        counts = self.db_hdl.cursor().execute('SELECT {0}, COUNT(*) FROM urls{1} GROUP BY {0} ORDER BY COUNT(*) DESC, {0}'.format(column, where), params).fetchall()
+        if group_by == 'host':
+            counts = [(value[::-1] if value else value, count) for value, count in counts]
+        return counts
+
     def get_next_url_from_db(self, filter_hostname=None):
         """
         Get the next URL to be processed from the database.
@@ -348,37 +485,71 @@ class YetAnotherWebCrawler():
         :returns: :class:`str` -- The next URL to be processed.
         """
 
-        logger = logging.getLogger('get_next_url_from_db')
-        next_url = None
-        # Get a URL with status STATUS_PROCESSING and a valid hostname suffix
-        for next_url in self.db_cur.execute('SELECT url FROM urls WHERE status=?', (URL_STATUS_PROCESSING,)):
-            if self.url_valid_by_sufix(next_url[0], filter_hostname):
-                next_url = next_url[0]
-                break
-            else:
-                next_url = None
+        # The hostname suffix filter is part of the queries so each one is answered by an index
+        where, params = self.get_urls_filter([URL_STATUS_PROCESSING], filter_hostname)
+        next_url = self.db_cur.execute('SELECT url FROM urls{} LIMIT 1'.format(where), params).fetchone()
 
         if next_url is None:
-            # Get the oldest URLs with STATUS_TODO and a valid hostname suffix
-            for next_url in self.db_cur.execute('SELECT url,updated FROM urls WHERE status=? ORDER BY updated ASC', (URL_STATUS_TODO,)):
-                if self.url_valid_by_sufix(next_url[0], filter_hostname):
-                    next_url = next_url[0]
-                    break
-                else:
-                    next_url = None
+            # Get the oldest URL with STATUS_TODO and a valid hostname suffix
+            where, params = self.get_urls_filter([URL_STATUS_TODO], filter_hostname)
+            next_url = self.db_cur.execute('SELECT url FROM urls{} ORDER BY updated ASC LIMIT 1'.format(where), params).fetchone()
 
             if next_url is None:
-                # Get the oldest URLs with STATUS_DONE, if the delta time defined for the Crawler update has expired and a valid hostname suffix
+                # Get the oldest URL with STATUS_DONE, if the delta time defined for the Crawler update has expired and a valid hostname suffix
                 now = convert_timestamp(datetime.datetime.now())
-                for next_url in self.db_cur.execute('SELECT url,updated FROM urls WHERE status=? ORDER BY updated ASC', (URL_STATUS_DONE,)):
-                    if ((now - next_url[1]) > CRAWLER_UPDATE_DELTA) and self.url_valid_by_sufix(next_url[0], filter_hostname):
-                        # If the oldest record isn't older than the UPDATE delta parameter skip it
-                        next_url = next_url[0]
-                        break
-                    else:
-                        next_url = None
+                where, params = self.get_urls_filter([URL_STATUS_DONE], filter_hostname, until=now - CRAWLER_UPDATE_DELTA)
+                next_url = self.db_cur.execute('SELECT url FROM urls{} ORDER BY updated ASC LIMIT 1'.format(where), params).fetchone()
+
+        return next_url[0] if next_url else None
+
+    def save_checkpoint(self, filter_hostname=None):
+        """
+        Save the URLs being processed and the hostname filter, so the next crawling operation can resume from them.
+
+        :param filter_hostname: The filter to be applied to the network location part of the URL (Default is None).
+        :type filter_hostname: :class:`str`
+        """
+
+        logger = logging.getLogger('save_checkpoint')
+        now = convert_timestamp(datetime.datetime.now())
+        filter_hostname = filter_hostname.decode('utf8') if filter_hostname else None
+        try:
+            # Prepared statements are used to avoid SQL injection vulnerabilities
+            with self.db_hdl:
+                self.db_cur.execute('DELETE FROM checkpoint')
+                self.db_cur.execute('INSERT INTO checkpoint(url_id, filter_hostname, created) SELECT id, ?, ? FROM urls WHERE status=?',
+                        (filter_hostname, now, URL_STATUS_PROCESSING))
+            logger.debug('Checkpoint saved.')
+        except sqlite3.IntegrityError, err:
+            logger.debug('Checkpoint could not be saved! {}'.format(err))
+
+    def load_checkpoint(self):
+        """
+        Get the URLs still being processed and the hostname filter of the last checkpoint, removing it.
+
+        :returns: :class:`tuple` -- The list of URLs and the hostname filter (None if no checkpoint exists).
+        """
 
-        return next_url
+        # Prepared statements are used to avoid SQL injection vulnerabilities
+        records = self.db_cur.execute('SELECT urls.url, checkpoint.filter_hostname FROM checkpoint JOIN urls ON urls.id=checkpoint.url_id\
+ WHERE urls.status=? ORDER BY checkpoint.url_id', (URL_STATUS_PROCESSING,)).fetchall()
+        with self.db_hdl:
+            self.db_cur.execute('DELETE FROM checkpoint')
+        if not records:
+            return [], None
+        filter_hostname = records[0][1].encode('utf8') if records[0][1] else None
+        return [record[0] for record in records], filter_hostname
+
+    def request_stop(self, signum=None, frame=None):
+        """
+        Ask the crawler to stop before processing the next URL.
+
+        Can be used as a signal handler.
+        """
+
+        logger = logging.getLogger('request_stop')
+        logger.info('Stop requested, finishing the current URL...')
+        self.stop_requested = True
 
     def set_url(self, url):
         """
@@ -417,19 +588,50 @@ class YetAnotherWebCrawler():
                     # Add the URL in canonical form to the Crawler URL list
                     self.urls.add(good_url)
 
-    def start_crawling(self, url=None, filter_hostname=None):
+    def start_crawling(self, url=None, filter_hostname=None, max_pages=None, max_seconds=None, max_bytes=None):
         """
         Let the crawling begin!
 
+        Crawling goes on till a budget is exhausted or a stop is requested (see :meth:`request_stop`).
+        Without any budget the crawler waits for URLs to refresh when none is left to crawl, with a budget
+        it stops instead.
+        The URL being processed when crawling stops is saved in a checkpoint, together with the hostname
+        filter, so the next crawling operation without a URL resumes from it.
+
         :param url: The first URL to begin crawling (default None).
         :type url: :class:`str`
+
+        :param filter_hostname: The filter to be applied to the network location part of the URL.
+            If None the filter of the checkpoint is used, an empty string crawls without filter (Default is None).
+        :type filter_hostname: :class:`str`
+
+        :param max_pages: Stop after crawling this number of webpages (Default is None, no limit).
+        :type max_pages: :class:`int`
+
+        :param max_seconds: Stop after crawling for this number of seconds (Default is None, no limit).
+        :type max_seconds: :class:`float`
+
+        :param max_bytes: Stop after downloading this number of bytes (Default is None, no limit).
+        :type max_bytes: :class:`int`
         """
 
         logger = logging.getLogger('start_crawling')
 
-        # If the user didn't give a starting URL we try the database
+        # Reset before any work, so a stop requested while looking for the first URL is not lost
+        self.stop_requested = False
+        bounded = max_pages is not None or max_seconds is not None or max_bytes is not None
+
+        # If the user didn't give a starting URL we try the last checkpoint and then the database
         if url is None:
-            url = self.get_next_url_from_db(filter_hostname)
+            checkpoint_urls, checkpoint_filter = self.load_checkpoint()
+            if filter_hostname is None and checkpoint_filter:
+                logger.warning("Using the hostname filter {} of the previous crawling operation, use -f '' to crawl without it.".format(checkpoint_filter))
+                filter_hostname = checkpoint_filter
+            if checkpoint_urls and self.url_valid_by_sufix(checkpoint_urls[0], filter_hostname):
+                logger.info('Resuming from checkpoint with {} URLs being processed.'.format(len(checkpoint_urls)))
+                url = checkpoint_urls[0]
+            else:
+                url = self.get_next_url_from_db(filter_hostname)
             if url:
                 self.set_url(url)
             elif not self.get_all_urls_from_db().fetchone():
@@ -442,30 +644,62 @@ class YetAnotherWebCrawler():
             else:
                 raise YetAnotherWebCrawlerException("URL {} - invalid!")
 
-        # Infinit loop to crawl the web till exhaustion (probably not going to happen...)
-        # If no more URLs are found ready to crawl, the Crawler waits for the refresh period to end.
-        # When the refresh period ends, the Crawler enables refreshing alerady existing database records.
-        while True:
-            if self.url is None:
-                logger.info('No URLs found in database to crawl, waiting {} seconds...'.format(CRAWLER_REFRESH_PERIOD))
-                time.sleep(CRAWLER_REFRESH_PERIOD)
-            else:
-                url_list = self.parse_content(self.url)
-                # Get all URLs from the webpage and add them to the database
-                if url_list:
-                    self.set_urls(url_list, filter_hostname)
-                    for good_url in self.urls:
-                        self.add_url_to_db(good_url)
-                        self.add_link_to_url(self.url, good_url)
-                # The URL was processed - the details can be saved in the database
-                self.set_url_details_in_db(self.url, self.url_digest, URL_STATUS_DONE)
-            # Get the next available URL to crawl from the database
-            url = self.get_next_url_from_db(filter_hostname)
-            if url:
-                self.set_url(url)
-                self.set_url_details_in_db(self.url, None, URL_STATUS_PROCESSING)
-            else:
-                self.set_url(None)
+        self.pages_crawled = 0
+        self.bytes_crawled = 0
+        started = time.time()
+        # Requests use the addresses resolved by the host cache
+        self.host_cache.install()
+        try:
+            # Loop to crawl the web till a budget is exhausted or a stop is requested.
+            # If no more URLs are found ready to crawl, the Crawler waits for the refresh period to end.
+            # When the refresh period ends, the Crawler enables refreshing alerady existing database records.
+            while True:
+                elapsed = time.time() - started
+                if self.stop_requested:
+                    break
+                elif max_pages is not None and self.pages_crawled >= max_pages:
+                    logger.info('Maximum number of webpages crawled.')
+                    break
+                elif max_seconds is not None and elapsed >= max_seconds:
+                    logger.info('Maximum crawling time reached.')
+                    break
+                elif max_bytes is not None and self.bytes_crawled >= max_bytes:
+                    logger.info('Maximum number of bytes downloaded.')
+                    break
+
+                if self.url is None and bounded:
+                    # A run with a budget is a batch job, it ends instead of waiting for URLs to refresh
+                    logger.info('No URLs found in database to crawl.')
+                    break
+                elif self.url is None:
+                    wait = CRAWLER_REFRESH_PERIOD
+                    logger.info('No URLs found in database to crawl, waiting {} seconds...'.format(wait))
+                    time.sleep(wait)
+                else:
+                    url_list = self.parse_content(self.url)
+                    # Get all URLs from the webpage and add them to the database
+                    if url_list:
+                        self.set_urls(url_list, filter_hostname)
+                        for good_url in self.urls:
+                            self.add_url_to_db(good_url)
+                            self.add_link_to_url(self.url, good_url)
+                    # The URL was processed - the details can be saved in the database
+                    self.set_url_details_in_db(self.url, self.url_digest, URL_STATUS_DONE)
+                    self.pages_crawled += 1
+                    self.bytes_crawled += self.url_size
+                # Get the next available URL to crawl from the database
+                url = self.get_next_url_from_db(filter_hostname)
+                if url:
+                    self.set_url(url)
+                    self.set_url_details_in_db(self.url, None, URL_STATUS_PROCESSING)
+                else:
+                    self.set_url(None)
+        finally:
+            self.host_cache.uninstall()
+
+        # Every database change is already committed, only the URLs being processed are left to save
+        self.save_checkpoint(filter_hostname)
+        logger.info('Crawling stopped - {} webpages and {} bytes in {:.0f} seconds.'.format(self.pages_crawled, self.bytes_crawled, time.time() - started))
 
 
 def convert_timestamp(dt):
@@ -480,6 +714,22 @@ def convert_timestamp(dt):
     return time.mktime(dt.timetuple())
 
 
+def reverse_netloc(url):
+    """
+    Reverse the network location part of a URL.
+
+    A hostname suffix becomes a prefix of the reversed network location,
+    which allows the database to search hostname suffixes using an index.
+
+    :param url: The URL.
+    :type url: :class:`unicode`
+
+    :returns: :class:`unicode` -- The reversed network location (e.g. gro.elpmaxe for http://example.org/).
+    """
+
+    return urlparse(url).netloc[::-1]
+
+
 def create_schema(db_hdl):
     """
     Create the database schema.
@@ -489,8 +739,55 @@ def create_schema(db_hdl):
     """
 
     db_hdl.execute('CREATE TABLE urls\
- (id integer primary key autoincrement, url varchar unique, status integer DEFAULT NULL, digest varchar DEFAULT NULL, created long, updated long)')
+ (id integer primary key autoincrement, url varchar unique, reversed_netloc varchar DEFAULT NULL, status integer DEFAULT NULL, digest varchar DEFAULT NULL, created long, updated long)')
     db_hdl.execute('CREATE TABLE links (url_id integer key, link varchar DEFAULT NULL)')
+    create_checkpoint_schema(db_hdl)
+    create_indexes(db_hdl)
+
+
+def create_checkpoint_schema(db_hdl):
+    """
+    Create the table of the URLs being processed when crawling stopped, if it does not exist yet.
+
+    :param db_hdl: The database handler.
+    :type db_hdl: class:`sqlite3.Connection`
+    """
+
+    db_hdl.execute('CREATE TABLE IF NOT EXISTS checkpoint (url_id integer primary key, filter_hostname varchar DEFAULT NULL, created long)')
+
+
+def create_indexes(db_hdl):
+    """
+    Create the database indexes used to search URLs, if they do not exist yet.
+
+    :param db_hdl: The database handler.
+    :type db_hdl: class:`sqlite3.Connection`
+    """
+
+    db_hdl.execute('CREATE INDEX IF NOT EXISTS urls_status_updated ON urls (status, updated)')
+    db_hdl.execute('CREATE INDEX IF NOT EXISTS urls_updated ON urls (updated)')
+    db_hdl.execute('CREATE INDEX IF NOT EXISTS urls_reversed_netloc ON urls (reversed_netloc)')
+    db_hdl.execute('CREATE INDEX IF NOT EXISTS urls_digest ON urls (digest)')
+
+
+def upgrade_schema(db_hdl):
+    """
+    Upgrade the schema of a database created by a previous version.
+
+    :param db_hdl: The database handler.
+    :type db_hdl: class:`sqlite3.Connection`
+    """
+
+    logger = logging.getLogger('upgrade_schema')
+    with db_hdl:
+        columns = [column[1] for column in db_hdl.execute('PRAGMA table_info(urls)')]
+        if 'reversed_netloc' not in columns:
+            logger.info('Adding the reversed_netloc column to the urls table.')
+            db_hdl.create_function('reverse_netloc', 1, reverse_netloc)
+            db_hdl.execute('ALTER TABLE urls ADD COLUMN reversed_netloc varchar DEFAULT NULL')
+            db_hdl.execute('UPDATE urls SET reversed_netloc=reverse_netloc(url)')
+        create_checkpoint_schema(db_hdl)
+        create_indexes(db_hdl)
 
 
 def database_exists(db_location):
@@ -509,7 +806,7 @@ def database_exists(db_location):
     return os.path.isfile(db_location)
 
 
-def connect_to_database(db_location):
+def connect_to_database(db_location, pragmas=()):
     """
     Create a connection to the DB.
 
@@ -519,20 +816,83 @@ def connect_to_database(db_location):
     :param db_location: The Location of the database.
     :type db_location: :class:`str`
 
+    :param pragmas: SQLite pragmas (e.g. page_size=16384) applied before the schema is created (Default is none).
+    :type pragmas: :class:`list`
+
     :returns: :class:`sqlite3.Connection` -- The handler of a connection to the database.
     """
 
     db_exists = database_exists(db_location)
     db_hdl = None
     db_hdl = sqlite3.connect(db_location, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
+    # Some pragmas (e.g. page_size) only take effect on an empty database
+    for pragma in pragmas:
+        db_hdl.execute('PRAGMA {}'.format(pragma))
 
     # If DB file does not exist we need to create it
     if not db_exists:
         create_schema(db_hdl)
+    else:
+        upgrade_schema(db_hdl)
 
     return db_hdl
 
 
+def parse_time(value):
+    """
+    Convert a user given time to a timestamp.
+
+    :param value: A timestamp, YYYY-MM-DD or YYYY-MM-DD HH:MM:SS.
+    :type value: :class:`str`
+
+    :returns: :class:`float` -- The timestamp.
+    """
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for time_format in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return convert_timestamp(datetime.datetime.strptime(value, time_format))
+        except ValueError:
+            continue
+    raise ValueError('Invalid time {}'.format(value))
+
+
+def export_urls(url_records, output, export_format):
+    """
+    Write URL records to a file, one per line.
+
+    Records are read from the database in batches, so the memory used does not depend on their number.
+
+    :param url_records: The URL records, as returned by :meth:`YetAnotherWebCrawler.query_urls_from_db`.
+    :type url_records: :class:`sqlite3.Cursor`
+
+    :param output: The file to write to.
+    :type output: :class:`file`
+
+    :param export_format: One of EXPORT_FORMATS.
+    :type export_format: :class:`str`
+    """
+
+    fields = ('id', 'url', 'status', 'digest', 'created', 'updated')
+    if export_format == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(fields)
+    while True:
+        rows = url_records.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            record = (row[0], row[1], URL_STATUS_NAMES.get(row[2]), row[3], row[4], row[5])
+            if export_format == 'csv':
+                writer.writerow([value.encode('utf8') if isinstance(value, unicode) else value for value in record])
+            else:
+                output.write(json.dumps(OrderedDict(zip(fields, record))))
+                output.write('\n')
+
+
 def main(argv=None):
 
     logger = logging.getLogger('MAIN')
@@ -542,13 +902,18 @@ def main(argv=None):
     filter_hostname = None
     operation = None
     db_hdl = None
+    export_format = None
+    output_file = None
+    filters = dict()
+    budgets = dict()
 
     if argv is None:
         argv = sys.argv
     try:
         try:
-            options, args = getopt.getopt(argv[1:], "hu:f:g:ad:", ["help",
-                "url=", "filter=", "get=", "all", "debug="])
+            options, args = getopt.getopt(argv[1:], "hu:f:g:ae:o:d:", ["help",
+                "url=", "filter=", "get=", "all", "export=", "output=", "summary", "status=",
+                "since=", "until=", "digest=", "max-pages=", "max-seconds=", "max-bytes=", "debug="])
             for opt, arg in options:
                 if opt in ('-h', '--help'):
                     raise Usage(__doc__)
@@ -564,26 +929,53 @@ def main(argv=None):
                     get_url = arg
                 elif opt in ('-a', '--all'):
                     operation = OPERATION_ALL
+                elif opt in ('-e', '--export') and arg in EXPORT_FORMATS:
+                    operation = OPERATION_EXPORT
+                    export_format = arg
+                elif opt in ('-e', '--export'):
+                    raise Usage('Invalid export format {}'.format(arg))
+                elif opt in ('-o', '--output'):
+                    output_file = arg
+                elif opt == '--summary':
+                    operation = OPERATION_SUMMARY
+                elif opt == '--status':
+                    status_values = dict((name, status) for status, name in URL_STATUS_NAMES.iteritems())
+                    try:
+                        filters['statuses'] = [status_values[name] for name in arg.upper().split(',')]
+                    except KeyError, err:
+                        raise Usage('Invalid status {}'.format(err))
+                elif opt in ('--since', '--until'):
+                    try:
+                        filters[opt[2:]] = parse_time(arg)
+                    except ValueError, err:
+                        raise Usage(err)
+                elif opt == '--digest':
+                    filters['digest'] = arg
+                elif opt in ('--max-pages', '--max-seconds', '--max-bytes'):
+                    try:
+                        budgets[opt[2:].replace('-', '_')] = float(arg) if opt == '--max-seconds' else int(arg)
+                    except ValueError, err:
+                        raise Usage(err)
 
         except getopt.error, err:
-            raise Usage(msg)
+            raise Usage(err)
+
+        if filter_hostname:
+            filters['filter_hostname'] = filter_hostname
 
         try:
             db_hdl = connect_to_database(DB_NAME)
             crawl = YetAnotherWebCrawler(db_hdl)
             if (operation is None and url is None) or (url):
-                crawl.start_crawling(url, filter_hostname)
+                # Signals only reach the main thread, so their handlers are set here instead of in the crawler
+                for signum in (signal.SIGINT, signal.SIGTERM):
+                    signal.signal(signum, crawl.request_stop)
+                crawl.start_crawling(url, filter_hostname, **budgets)
             elif operation == OPERATION_GET and get_url:
                 url_record = crawl.get_url_from_db(get_url)
                 if url_record is not None:
                     print('<ID> <URL> <STATUS> <DIGEST> <CREATION TIMESTAMP> <UPDATED TIMESTAMP>')
-                    status = ''
-                    if url_record[2] == URL_STATUS_PROCESSING:
-                        status = 'PROCESSING'
-                    elif url_record[2] == URL_STATUS_TODO:
-                        status = 'TODO'
-                    elif url_record[2] == URL_STATUS_DONE:
-                        status = 'DONE'
+                    status = URL_STATUS_NAMES.get(url_record[2], '')
                     print('{} {} {} {} {} {}'.format(url_record[0], url_record[1], status, url_record[3],\
                             datetime.datetime.fromtimestamp(url_record[4]), datetime.datetime.fromtimestamp(url_record[5])))
                 else:
@@ -595,6 +987,20 @@ def main(argv=None):
                         print('{}'.format(url[0]))
                 else:
                     print('No Database Record was found.')
+            elif operation == OPERATION_EXPORT:
+                url_records = crawl.query_urls_from_db(**filters)
+                if output_file:
+                    with open(output_file, 'wb') as output:
+                        export_urls(url_records, output, export_format)
+                else:
+                    export_urls(url_records, sys.stdout, export_format)
+            elif operation == OPERATION_SUMMARY:
+                print('<STATUS> <COUNT>')
+                for status, count in crawl.count_urls_from_db('status', **filters):
+                    print('{} {}'.format(URL_STATUS_NAMES.get(status, status), count))
+                print('<HOSTNAME> <COUNT>')
+                for hostname, count in crawl.count_urls_from_db('host', **filters):
+                    print('{} {}'.format(hostname.encode('utf8') if hostname else hostname, count))
 
         except sqlite3.Error, e:
             logger.debug('Error connecting to database %s' % e.args[0])